@@ -2,6 +2,16 @@ import streamlit as st
 import pandas as pd
 import os
 from recommender_agent import CourseRecommender, create_and_save_faiss_index
+from cosine_faiss_utils import (
+    EXAMPLE_QUERIES,
+    encode_query,
+    load_courses_df,
+    load_embedding_model,
+    load_example_embeddings,
+    load_index,
+    saved_index_is_stale,
+    update_faiss_index,
+)
 
 # Set page configuration
 st.set_page_config(
@@ -45,6 +55,58 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource(max_entries=1)
+def get_embedder():
+    """Load the sentence transformer model once and share it across reruns and sessions"""
+    return load_embedding_model()
+
+@st.cache_resource
+def get_index():
+    """Load the FAISS index once and keep it in memory for all sessions"""
+    return load_index()
+
+@st.cache_data
+def get_courses_df():
+    """Load the processed course data once instead of on every rerun"""
+    return load_courses_df()
+
+@st.cache_resource
+def get_example_embeddings():
+    """Load the precomputed example query embeddings once instead of on every rerun"""
+    return load_example_embeddings()
+
+@st.cache_resource
+def get_recommender():
+    """Build the recommender once, so its course records are shared by all reruns and sessions"""
+    return CourseRecommender(
+        model=get_embedder(),
+        index=get_index(),
+        df=get_courses_df(),
+        example_embeddings=get_example_embeddings()
+    )
+
+@st.cache_data(ttl="1h", max_entries=1024)
+def embed_query(query, _model):
+    """Encode a query once so repeated queries skip the transformer forward pass"""
+    return encode_query(query, _model)
+
+@st.cache_data(ttl="1h", max_entries=512)
+def cached_recommend(query, top_k, _recommender):
+    """Get recommendations for a (query, top_k) pair, reusing earlier results"""
+    query_embedding = _recommender.example_embedding(query)
+    if query_embedding is None:
+        query_embedding = embed_query(query, _recommender.model)
+    return _recommender.get_recommendations(query, top_k=top_k, query_embedding=query_embedding)
+
+def clear_cached_system():
+    """Drop everything cached from the current index and course data"""
+    get_index.clear()
+    get_courses_df.clear()
+    get_example_embeddings.clear()
+    get_recommender.clear()
+    cached_recommend.clear()
+    to_csv_bytes.clear()
+
 def initialize_system():
     """Initialize the course recommendation system"""
     csv_path = "FutureSkills Prime_data.csv"
@@ -52,16 +114,33 @@ def initialize_system():
     # Check if the processed files exist, if not create them
     if not os.path.exists('course_index.faiss') or not os.path.exists('processed_courses.csv'):
         if os.path.exists(csv_path):
+            clear_cached_system()
             with st.spinner("Setting up the recommendation system for the first time... This may take a few moments."):
-                create_and_save_faiss_index(csv_path)
+                create_and_save_faiss_index(csv_path, model=get_embedder())
             st.success("System initialized successfully!")
         else:
             st.error(f"Error: {csv_path} not found in current directory.")
             return None
+    # Rebuild files saved before course ids were stored, whatever their mtime
+    elif saved_index_is_stale():
+        if os.path.exists(csv_path):
+            clear_cached_system()
+            with st.spinner("Rebuilding the recommendation system for the new index format..."):
+                create_and_save_faiss_index(csv_path, model=get_embedder())
+        else:
+            st.error(f"Error: {csv_path} not found in current directory.")
+            return None
+    # Apply changes to the course data without rebuilding the whole index
+    elif os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime('course_index.faiss'):
+        # Drop everything cached from the old index first, which also releases
+        # the memory-mapped index file before it is replaced
+        clear_cached_system()
+        with st.spinner("Updating the recommendation system with the latest course data..."):
+            update_faiss_index(csv_path, model=get_embedder())
     
     # Initialize the recommender
     try:
-        recommender = CourseRecommender()
+        recommender = get_recommender()
         if recommender.is_ready():
             return recommender
         else:
@@ -71,10 +150,26 @@ def initialize_system():
         st.error(f"Error initializing recommender: {str(e)}")
         return None
 
-def display_course_card(course, score, index):
-    """Display a course recommendation in a card format"""
-    with st.container():
-        st.markdown(f"""
+@st.cache_data(ttl="1h", max_entries=512)
+def to_csv_bytes(query, top_k, _recommendations):
+    """Build the CSV download for the recommendations of a (query, top_k) pair once"""
+    results_df = pd.DataFrame([
+        {
+            'Rank': i,
+            'Title': course['Title'],
+            'Offered_by': course['Offered_by'],
+            'Domain': course['Domain'],
+            'Duration': course['Duration'],
+            'Price': course['Price'],
+            'Similarity_Score': score
+        }
+        for i, (course, score) in enumerate(_recommendations, 1)
+    ])
+    return results_df.to_csv(index=False).encode('utf-8')
+
+def course_card_html(course, score, index):
+    """Build the HTML for a course recommendation in a card format"""
+    return f"""
         <div class="course-card">
             <h4 style="color: #1f77b4; margin-bottom: 0.5rem;">
                 {index}. {course['Title']}
@@ -93,7 +188,7 @@ def display_course_card(course, score, index):
                 <span class="similarity-score">Similarity: {score:.4f}</span>
             </div>
         </div>
-        """, unsafe_allow_html=True)
+        """
 
 def main():
     """Main Streamlit application"""
@@ -120,14 +215,7 @@ def main():
         """)
         
         st.header("💡 Example Queries")
-        st.markdown("""
-        - "artificial intelligence machine learning"
-        - "web development fullstack programming"
-        - "data science analytics"
-        - "communication skills leadership"
-        - "python programming under 10000"
-        - "business courses cheap"
-        """)
+        st.markdown("\n".join(f'- "{query}"' for query in EXAMPLE_QUERIES))
     
     # Initialize the system
     recommender = initialize_system()
@@ -170,7 +258,7 @@ def main():
     if get_recommendations and user_query.strip():
         with st.spinner("🔍 Finding the best courses for you..."):
             try:
-                recommendations = recommender.get_recommendations(user_query, top_k=num_recommendations)
+                recommendations = cached_recommend(user_query, num_recommendations, recommender)
                 
                 if recommendations:
                     st.success(f"Found {len(recommendations)} course recommendations!")
@@ -190,32 +278,20 @@ def main():
                     st.markdown("---")
                     st.header("📚 Recommended Courses")
                     
-                    # Display recommendations
-                    for i, (course, score) in enumerate(recommendations, 1):
-                        display_course_card(course, score, i)
+                    # Display recommendations as a single HTML block
+                    cards_html = "".join(
+                        course_card_html(course, score, i)
+                        for i, (course, score) in enumerate(recommendations, 1)
+                    )
+                    st.markdown(cards_html, unsafe_allow_html=True)
                     
                     # Option to download results
-                    if st.button("📥 Download Results as CSV"):
-                        results_df = pd.DataFrame([
-                            {
-                                'Rank': i,
-                                'Title': course['Title'],
-                                'Offered_by': course['Offered_by'],
-                                'Domain': course['Domain'],
-                                'Duration': course['Duration'],
-                                'Price': course['Price'],
-                                'Similarity_Score': score
-                            }
-                            for i, (course, score) in enumerate(recommendations, 1)
-                        ])
-                        
-                        csv = results_df.to_csv(index=False)
-                        st.download_button(
-                            label="Download CSV",
-                            data=csv,
-                            file_name=f"course_recommendations_{user_query.replace(' ', '_')}.csv",
-                            mime="text/csv"
-                        )
+                    st.download_button(
+                        label="📥 Download Results as CSV",
+                        data=to_csv_bytes(user_query, num_recommendations, recommendations),
+                        file_name=f"course_recommendations_{user_query.replace(' ', '_')}.csv",
+                        mime="text/csv"
+                    )
                 
                 else:
                     st.warning("No courses found matching your criteria. Try a different search term.")
@@ -1,29 +1,109 @@
 import pandas as pd
 import numpy as np
 import faiss
+import torch
 from sentence_transformers import SentenceTransformer
+from contextlib import nullcontext
 import os
 import re
+import hashlib
 
-def create_and_save_faiss_index(df_path):
+# Formatting characters stripped from prices such as "4,570/- "
+_PRICE_RE = re.compile(r'[,/-]')
+
+# Sentence transformer model used for both indexing and querying
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# Set COURSE_EMBEDDER_ONNX=1 to run the model through ONNX Runtime with dynamic
+# int8 quantization, which uses VNNI int8 dot products on recent x86 CPUs.
+# Needs optimum[onnxruntime]; rebuild the index after switching so courses and
+# queries are embedded by the same model. Use 'onnx/model_qint8_avx2.onnx' on
+# CPUs without AVX-512.
+USE_ONNX_INT8 = os.environ.get('COURSE_EMBEDDER_ONNX', '0') == '1'
+ONNX_INT8_FILE = 'onnx/model_qint8_avx512_vnni.onnx'
+
+# Number of course texts encoded per forward pass when building the index
+ENCODE_BATCH_SIZE = 256
+
+# FAISS index layout: an HNSW graph with 32 links per node gives sub-linear
+# search with negligible recall loss, and storing the vectors as fp16 scalar
+# quantized codes halves the index in memory and on disk
+INDEX_FACTORY = 'HNSW32,SQfp16'
+HNSW_EF_CONSTRUCTION = 200
+
+# File header of the IndexIDMap2 that wraps every course index
+_INDEX_FOURCC = b'IxM2'
+
+# Set COURSE_INDEX_GPU=1 to search on the GPU when FAISS can see one. This only
+# pays off for batched queries; a single interactive query is faster on CPU.
+USE_GPU = os.environ.get('COURSE_INDEX_GPU', '0') == '1'
+
+# Number of queries encoded per forward pass in batched search
+QUERY_BATCH_SIZE = 64
+
+# When filtering by price, fetch this many times top_k candidates so enough
+# remain after the filter
+PRICE_FILTER_OVERFETCH = 5
+
+# Example queries shown to users. Their embeddings are computed when the index
+# is built, so running one of them needs no model forward pass.
+EXAMPLE_QUERIES = [
+    "artificial intelligence machine learning",
+    "web development fullstack programming",
+    "data science analytics",
+    "communication skills leadership",
+    "python programming under 10000",
+    "business courses cheap"
+]
+EXAMPLE_EMBEDDINGS_PATH = 'example_embeddings.npz'
+
+
+def load_embedding_model():
     """
-    Create and save a FAISS index for course recommendations.
+    Load the sentence transformer model used to embed courses and queries.
+    
+    Loading the model is expensive, so callers should load it once and pass
+    it to the functions below rather than letting each call load its own.
+    
+    Returns:
+        SentenceTransformer: The loaded embedding model. This is the int8 ONNX model
+            if USE_ONNX_INT8 is set, otherwise the PyTorch model on the GPU when one
+            is available.
+    """
+    if USE_ONNX_INT8:
+        try:
+            return SentenceTransformer(
+                MODEL_NAME, backend='onnx', model_kwargs={'file_name': ONNX_INT8_FILE}
+            )
+        except Exception as e:
+            print(f"Warning: Could not load the int8 ONNX model, using PyTorch: {str(e)}")
+    
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    return SentenceTransformer(MODEL_NAME, device=device)
+
+
+def clean_courses(df):
+    """
+    Clean raw course data into the processed layout used by the index.
     
     Args:
-        df_path (str): Path to the CSV file containing course data
+        df (pd.DataFrame): Raw course data with Title, Offered_by, Domain, Duration and Price
+    
+    Returns:
+        pd.DataFrame: The cleaned data with combined_features and content_hash columns
     """
-    # Read the CSV into a pandas DataFrame
-    print("Loading course data...")
-    df = pd.read_csv(df_path)
+    df = df.copy()
     
     # Clean the data - Price column
     print("Cleaning price data...")
-    # Fill null values with '0'
-    df['Price'] = df['Price'].fillna('0')
-    
-    # Remove /- and commas from Price column and convert to numeric
-    df['Price'] = df['Price'].astype(str).apply(lambda x: re.sub(r'[,/-]', '', x).strip())
-    df['Price'] = pd.to_numeric(df['Price'], errors='coerce').fillna(0)
+    # Fill null values with '0', then remove /- and commas in one vectorized pass
+    df['Price'] = (
+        df['Price'].fillna('0').astype(str)
+        .str.replace(_PRICE_RE, '', regex=True)
+        .str.strip()
+    )
+    # Convert to numeric; float32 keeps the occasional paise and halves the column
+    df['Price'] = pd.to_numeric(df['Price'], errors='coerce').fillna(0).astype(np.float32)
     
     # Fill null values in other columns
     df['Title'] = df['Title'].fillna('')
@@ -31,47 +111,363 @@ def create_and_save_faiss_index(df_path):
     df['Domain'] = df['Domain'].fillna('')
     df['Duration'] = df['Duration'].fillna('')
     
-    # Create combined_features column
+    # Create combined_features column. Price is left out: numbers add nothing to
+    # the semantic embedding, so budgets are applied as a filter at search time.
     print("Creating combined features...")
-    df['combined_features'] = (
-        df['Title'].astype(str) + ' ' +
-        df['Offered_by'].astype(str) + ' ' +
-        df['Domain'].astype(str) + ' ' +
-        df['Duration'].astype(str) + ' ' +
-        df['Price'].astype(str)
+    df['combined_features'] = df['Title'].astype(str).str.cat(
+        [df['Offered_by'].astype(str), df['Domain'].astype(str), df['Duration'].astype(str)],
+        sep=' ',
+        na_rep=''
+    )
+    
+    # Fingerprint each course so index updates can tell which rows changed
+    df['content_hash'] = (df['combined_features'] + '|' + df['Price'].astype(str)).map(
+        lambda text: hashlib.md5(text.encode('utf-8')).hexdigest()
     )
     
+    return df
+
+
+def _encode_courses(texts, model):
+    """
+    Encode course texts into normalized float32 embeddings ready for FAISS.
+    """
+    # Create normalized embeddings so inner product equals cosine similarity.
+    # Encode in large batches, in fp16 on the GPU.
+    on_gpu = model.device.type == 'cuda'
+    with torch.autocast('cuda', dtype=torch.float16) if on_gpu else nullcontext():
+        embeddings = model.encode(
+            texts,
+            batch_size=ENCODE_BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=True
+        )
+    
+    # FAISS's SIMD kernels need a C-contiguous float32 matrix; without one, add()
+    # makes a hidden copy. Renormalize in place since fp16 encoding can drift.
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    faiss.normalize_L2(embeddings)
+    return embeddings
+
+
+def _new_index(dimension):
+    """
+    Create an empty course index. Vectors are stored under their course_id,
+    so courses can be added and removed without renumbering the rest.
+    """
+    index = faiss.index_factory(dimension, 'IDMap2,' + INDEX_FACTORY, faiss.METRIC_INNER_PRODUCT)
+    inner = faiss.downcast_index(index.index)
+    if isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    return index
+
+
+def _add_to_index(index, embeddings, course_ids):
+    """
+    Add embeddings to the index under the given course ids.
+    """
+    # Use every core for the OpenMP-parallel train/add
+    faiss.omp_set_num_threads(os.cpu_count() or 1)
+    
+    # Train the quantizer (if any) and add embeddings to index
+    if not index.is_trained:
+        index.train(embeddings)
+    index.add_with_ids(embeddings, np.asarray(course_ids, dtype=np.int64))
+
+
+def save_faiss_index(index, df, index_path='course_index.faiss', data_path='processed_courses.csv'):
+    """
+    Save the FAISS index and processed course data.
+    
+    The index is written to a temporary file and then moved into place, so a
+    process that has the old file memory-mapped (see load_index) keeps reading
+    the complete old index rather than a half-written new one.
+    
+    Args:
+        index (faiss.Index): Course index keyed by course_id
+        df (pd.DataFrame): Processed course data indexed by course_id
+        index_path (str): Path to save the FAISS index
+        data_path (str): Path to save the processed course CSV
+    """
+    print("Saving FAISS index...")
+    tmp_path = index_path + '.tmp'
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, index_path)
+    
+    print("Saving processed data...")
+    df.to_csv(data_path, index_label='course_id')
+
+
+def saved_index_is_stale(index_path='course_index.faiss', data_path='processed_courses.csv'):
+    """
+    Check whether the saved files predate course ids and content hashes.
+    
+    Such files hold a bare index whose vectors embed the old course features,
+    so they can be neither searched nor updated and must be rebuilt. Only the
+    index file header and the data file's column names are read.
+    
+    Args:
+        index_path (str): Path to the saved FAISS index
+        data_path (str): Path to the saved processed course CSV
+    
+    Returns:
+        bool: True if the saved files must be rebuilt with create_and_save_faiss_index
+    """
+    # Every FAISS index file starts with the fourcc of its outermost index type
+    with open(index_path, 'rb') as f:
+        if f.read(4) != _INDEX_FOURCC:
+            return True
+    columns = pd.read_csv(data_path, nrows=0).columns
+    return 'course_id' not in columns or 'content_hash' not in columns
+
+
+def create_and_save_faiss_index(df_path, model=None):
+    """
+    Create and save a FAISS index for course recommendations.
+    
+    Args:
+        df_path (str): Path to the CSV file containing course data
+        model (SentenceTransformer, optional): Preloaded embedding model
+    """
+    # Read the CSV into a pandas DataFrame
+    print("Loading course data...")
+    df = clean_courses(pd.read_csv(df_path))
+    df.index.name = 'course_id'
+    
     # Initialize sentence transformer model
-    print("Loading sentence transformer model...")
-    model = SentenceTransformer('all-MiniLM-L6-v2')
+    if model is None:
+        print("Loading sentence transformer model...")
+        model = load_embedding_model()
     
     # Create embeddings for combined features
     print("Creating embeddings...")
-    embeddings = model.encode(df['combined_features'].tolist())
-    
-    # Normalize embeddings
-    embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    embeddings = _encode_courses(df['combined_features'].tolist(), model)
     
     # Create FAISS index
     print("Creating FAISS index...")
     dimension = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dimension)
-    
-    # Add embeddings to index
-    index.add(embeddings.astype('float32'))
-    
-    # Save FAISS index
-    print("Saving FAISS index...")
-    faiss.write_index(index, 'course_index.faiss')
+    index = _new_index(dimension)
+    _add_to_index(index, embeddings, df.index)
     
-    # Save processed DataFrame
-    print("Saving processed data...")
-    df.to_csv('processed_courses.csv', index=False)
+    save_faiss_index(index, df)
+    save_example_embeddings(model)
     
     print(f"Successfully created and saved FAISS index with {index.ntotal} courses")
     print(f"Index dimension: {dimension}")
 
 
+def add_courses(index, df, new_courses, model=None):
+    """
+    Add courses to an index, encoding only the new courses.
+    
+    Args:
+        index (faiss.Index): Writable course index, as loaded with load_index(mmap=False)
+        df (pd.DataFrame): Processed course data indexed by course_id
+        new_courses (pd.DataFrame): Courses to add, as returned by clean_courses
+        model (SentenceTransformer, optional): Preloaded embedding model
+    
+    Returns:
+        pd.DataFrame: The processed course data including the new courses
+    """
+    if model is None:
+        print("Loading sentence transformer model...")
+        model = load_embedding_model()
+    
+    # New courses get ids after the highest id in use
+    first_id = int(df.index.max()) + 1 if len(df) else 0
+    new_courses = new_courses.set_axis(
+        pd.RangeIndex(first_id, first_id + len(new_courses), name='course_id')
+    )
+    
+    print(f"Creating embeddings for {len(new_courses)} new courses...")
+    embeddings = _encode_courses(new_courses['combined_features'].tolist(), model)
+    _add_to_index(index, embeddings, new_courses.index)
+    
+    return pd.concat([df, new_courses])
+
+
+def remove_courses(index, df, course_ids):
+    """
+    Remove courses from an index without re-encoding the remaining courses.
+    
+    HNSW graphs do not support deletion, so a new graph is built from the stored
+    vectors of the courses that are kept.
+    
+    Args:
+        index (faiss.Index): Writable course index, as loaded with load_index(mmap=False)
+        df (pd.DataFrame): Processed course data indexed by course_id
+        course_ids (list): Ids of the courses to remove
+    
+    Returns:
+        tuple: (faiss_index, dataframe) - The new index and the remaining course data
+    """
+    keep = df.index[~df.index.isin(course_ids)]
+    print(f"Removing {len(df) - len(keep)} courses...")
+    
+    new_index = _new_index(index.d)
+    if len(keep):
+        vectors = index.reconstruct_batch(np.asarray(keep, dtype=np.int64))
+        _add_to_index(new_index, np.ascontiguousarray(vectors, dtype=np.float32), keep)
+    
+    return new_index, df.loc[keep]
+
+
+def _surplus_courses(df, other):
+    """
+    Return the rows of df whose content hash occurs more often in df than in
+    other. For a hash seen n times in other, all but its first n rows in df
+    are returned.
+    """
+    occurrence = df.groupby('content_hash').cumcount()
+    available = df['content_hash'].map(other['content_hash'].value_counts()).fillna(0)
+    return df[occurrence >= available]
+
+
+def update_faiss_index(df_path, model=None):
+    """
+    Bring the saved FAISS index in line with the course CSV.
+    
+    Courses whose content hash is no longer in the CSV (or appears there fewer
+    times) are removed, and courses with a new or extra content hash are encoded
+    and added, so a refresh costs time in proportion to the number of changed
+    courses rather than the whole catalog.
+    Stale saved files (see saved_index_is_stale) are rebuilt from scratch.
+    
+    Args:
+        df_path (str): Path to the CSV file containing course data
+        model (SentenceTransformer, optional): Preloaded embedding model
+    """
+    if saved_index_is_stale():
+        print("Saved index has no course ids, rebuilding it...")
+        create_and_save_faiss_index(df_path, model=model)
+        return
+    
+    index = load_index(mmap=False, to_gpu=False)
+    df = load_courses_df()
+    
+    if not os.path.exists(EXAMPLE_EMBEDDINGS_PATH):
+        if model is None:
+            print("Loading sentence transformer model...")
+            model = load_embedding_model()
+        save_example_embeddings(model)
+    
+    print("Loading course data...")
+    source = clean_courses(pd.read_csv(df_path))
+    
+    # Compare hash counts, not just hash sets, so duplicate rows are tracked too
+    stale_ids = _surplus_courses(df, source).index
+    new_courses = _surplus_courses(source, df)
+    
+    if len(stale_ids) == 0 and len(new_courses) == 0:
+        # Mark the index as checked so mtime comparisons stop flagging it
+        os.utime('course_index.faiss')
+        print("FAISS index is up to date")
+        return
+    
+    if len(stale_ids):
+        index, df = remove_courses(index, df, stale_ids)
+    if len(new_courses):
+        df = add_courses(index, df, new_courses, model=model)
+    
+    save_faiss_index(index, df)
+    print(f"Successfully updated FAISS index: {len(new_courses)} added, "
+          f"{len(stale_ids)} removed, {index.ntotal} courses in total")
+
+
+def load_index(index_path='course_index.faiss', mmap=True, to_gpu=None):
+    """
+    Load the FAISS index from disk.
+    
+    By default the index is memory-mapped read-only, so the OS pages the stored
+    vectors in on demand instead of copying them all into RAM at startup. Where
+    memory-mapping is not supported, the index is read into memory instead.
+    
+    Args:
+        index_path (str): Path to the saved FAISS index
+        mmap (bool): Memory-map the index read-only. Pass False to get an index
+            that can be modified and written back.
+        to_gpu (bool, optional): Move the index to the GPU. Defaults to USE_GPU.
+    
+    Returns:
+        faiss.Index: The loaded FAISS index
+    """
+    # IO_FLAG_MMAP only maps IVF inverted lists; IO_FLAG_MMAP_IFC also maps the
+    # flat, scalar-quantized and HNSW storage this index uses
+    io_flags = 0
+    if mmap and hasattr(faiss, 'IO_FLAG_MMAP_IFC'):
+        io_flags = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+    try:
+        index = faiss.read_index(index_path, io_flags)
+    except RuntimeError as e:
+        if not io_flags:
+            raise
+        print(f"Warning: Could not memory-map the FAISS index, loading it into memory: {str(e)}")
+        index = faiss.read_index(index_path)
+    if USE_GPU if to_gpu is None else to_gpu:
+        index = index_to_gpu(index)
+    return index
+
+
+def index_to_gpu(index):
+    """
+    Copy the course vectors to an exact index on the first GPU.
+    
+    HNSW graphs have no GPU implementation, so the vectors stored in the index
+    are copied into a flat inner product index on the GPU under the same course
+    ids. Flat search is exact and, with queries batched, fast on a GPU.
+    
+    Args:
+        index (faiss.Index): CPU course index
+    
+    Returns:
+        faiss.Index: The GPU index, or the original index if no GPU is available
+    """
+    if faiss.get_num_gpus() == 0:
+        print("Warning: No GPU available to FAISS, searching on CPU.")
+        return index
+    
+    try:
+        res = faiss.StandardGpuResources()
+        gpu_index = _flat_copy(index, faiss.GpuIndexFlatIP(res, index.d))
+    except Exception as e:
+        print(f"Warning: Could not move FAISS index to GPU, searching on CPU: {str(e)}")
+        return index
+    
+    # The GPU resources must live as long as the index that uses them
+    gpu_index.referenced_objects.append(res)
+    return gpu_index
+
+
+def _flat_copy(index, flat_index):
+    """
+    Copy the vectors stored in a course index into an empty flat index, keeping
+    their course ids.
+    """
+    course_ids = faiss.vector_to_array(index.id_map)
+    
+    copy = faiss.IndexIDMap(flat_index)
+    # The id map does not own the flat index, so keep a reference to it
+    copy.referenced_objects = [flat_index]
+    if len(course_ids):
+        vectors = index.reconstruct_batch(course_ids)
+        copy.add_with_ids(np.ascontiguousarray(vectors, dtype=np.float32), course_ids)
+    return copy
+
+
+def load_courses_df(data_path='processed_courses.csv'):
+    """
+    Load the processed course data from disk.
+    
+    Args:
+        data_path (str): Path to the processed course CSV
+    
+    Returns:
+        pd.DataFrame: The processed course DataFrame, indexed by course_id
+    """
+    return pd.read_csv(data_path, index_col='course_id')
+
+
 def load_faiss_index():
     """
     Load the FAISS index and processed course data.
@@ -81,10 +477,10 @@ def load_faiss_index():
     """
     try:
         # Load FAISS index
-        index = faiss.read_index('course_index.faiss')
+        index = load_index()
         
         # Load processed DataFrame
-        df = pd.read_csv('processed_courses.csv')
+        df = load_courses_df()
         
         print(f"Successfully loaded FAISS index with {index.ntotal} courses")
         return index, df
@@ -98,7 +494,99 @@ def load_faiss_index():
         return None, None
 
 
-def search_faiss_index(query, index, df, top_k=10):
+def encode_queries(queries, model):
+    """
+    Encode user queries into normalized embeddings for searching the FAISS index.
+    
+    Args:
+        queries (list): User queries for course recommendations
+        model (SentenceTransformer): Embedding model (same as used for indexing)
+    
+    Returns:
+        np.ndarray: float32 array of shape (len(queries), dimension)
+    """
+    # Generate embeddings for the queries as a float32 buffer (no copy if already float32)
+    query_embeddings = model.encode(queries, batch_size=QUERY_BATCH_SIZE, convert_to_numpy=True)
+    query_embeddings = query_embeddings.astype(np.float32, copy=False)
+    
+    # Normalize the query embeddings in place
+    faiss.normalize_L2(query_embeddings)
+    
+    return query_embeddings
+
+
+def save_example_embeddings(model, path=EXAMPLE_EMBEDDINGS_PATH):
+    """
+    Encode EXAMPLE_QUERIES and save their embeddings next to the index.
+    
+    Args:
+        model (SentenceTransformer): Embedding model (same as used for indexing)
+        path (str): Path to save the example embeddings
+    """
+    print("Saving example query embeddings...")
+    np.savez(path, queries=np.array(EXAMPLE_QUERIES), embeddings=encode_queries(EXAMPLE_QUERIES, model))
+
+
+def load_example_embeddings(path=EXAMPLE_EMBEDDINGS_PATH):
+    """
+    Load the precomputed example query embeddings.
+    
+    Args:
+        path (str): Path to the saved example embeddings
+    
+    Returns:
+        dict: Maps each normalized example query (see example_key) to a float32
+            array of shape (1, dimension). Empty if the file does not exist.
+    """
+    if not os.path.exists(path):
+        return {}
+    
+    with np.load(path) as data:
+        return {
+            example_key(query): embedding[np.newaxis, :]
+            for query, embedding in zip(data['queries'], data['embeddings'])
+        }
+
+
+def example_key(query):
+    """
+    Normalize a query for lookup among the precomputed example embeddings.
+    """
+    return ' '.join(str(query).lower().split())
+
+
+def encode_query(query, model):
+    """
+    Encode a user query into a normalized embedding for searching the FAISS index.
+    
+    Args:
+        query (str): User query for course recommendations
+        model (SentenceTransformer): Embedding model (same as used for indexing)
+    
+    Returns:
+        np.ndarray: float32 array of shape (1, dimension)
+    """
+    return encode_queries([query], model)
+
+
+def _search_params(index, top_k):
+    """
+    Build per-query search parameters for the given index.
+    
+    Parameters are passed to each search call instead of being set on the index,
+    because the index may be shared between concurrent app sessions.
+    """
+    # Course indexes wrap the HNSW graph in an id map, which forwards the params
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, faiss.IndexHNSW):
+        # Explore enough of the graph to fill top_k reliably
+        return faiss.SearchParametersHNSW(efSearch=max(top_k * 4, 32))
+    return None
+
+
+def search_faiss_index(query, index, df, top_k=10, model=None, query_embedding=None, max_price=None,
+                       records=None):
     """
     Search for similar courses using the FAISS index.
     
@@ -107,6 +595,13 @@ def search_faiss_index(query, index, df, top_k=10):
         index: Loaded FAISS index
         df (pd.DataFrame): DataFrame containing processed course data
         top_k (int): Number of top recommendations to return
+        model (SentenceTransformer, optional): Preloaded embedding model. If not
+            given, the model is loaded for this call only.
+        query_embedding (np.ndarray, optional): Precomputed output of encode_query
+            for this query. If given, the query is not encoded again.
+        max_price (float, optional): Only return courses priced at or below this
+        records (dict, optional): df.to_dict('index'), built once by the caller.
+            Looking results up here avoids converting DataFrame rows per query.
     
     Returns:
         list: List of tuples containing (course_dict, similarity_score)
@@ -115,27 +610,90 @@ def search_faiss_index(query, index, df, top_k=10):
         print("Error: Index or DataFrame is None")
         return []
     
-    # Initialize sentence transformer model (same as used for indexing)
-    model = SentenceTransformer('all-MiniLM-L6-v2')
+    if query_embedding is None:
+        # Fall back to loading the model (same as used for indexing)
+        if model is None:
+            model = load_embedding_model()
+        query_embedding = encode_query(query, model)
     
-    # Generate embedding for the query
-    query_embedding = model.encode([query])
+    # Perform search on FAISS index
+    # Both sides are normalized, so the inner product scores are cosine similarities
+    fetch_k = top_k * PRICE_FILTER_OVERFETCH if max_price is not None else top_k
+    similarities, indices = index.search(query_embedding, fetch_k, params=_search_params(index, fetch_k))
     
-    # Normalize the query embedding
-    query_embedding = query_embedding / np.linalg.norm(query_embedding, axis=1, keepdims=True)
+    return _build_recommendations(df, indices[0], similarities[0], top_k, max_price, records)
+
+
+def search_faiss_index_batch(queries, index, df, top_k=10, model=None, max_prices=None, records=None):
+    """
+    Search for similar courses for several queries at once.
     
-    # Perform search on FAISS index
-    distances, indices = index.search(query_embedding.astype('float32'), top_k)
+    All queries are encoded together and searched with a single FAISS call,
+    which amortizes the per-call overhead (and the transfer cost on GPU).
     
-    # Convert L2 distances to cosine similarity scores
-    # For normalized vectors: cosine_similarity = (2 - L2_distance^2) / 2
-    similarities = (2 - distances[0] ** 2) / 2
+    Args:
+        queries (list): User queries for course recommendations
+        index: Loaded FAISS index
+        df (pd.DataFrame): DataFrame containing processed course data
+        top_k (int): Number of top recommendations to return per query
+        model (SentenceTransformer, optional): Preloaded embedding model. If not
+            given, the model is loaded for this call only.
+        max_prices (list, optional): Price limit (or None) for each query
+        records (dict, optional): df.to_dict('index'), built once by the caller
     
-    # Prepare results
+    Returns:
+        list: One list of (course_dict, similarity_score) tuples per query
+    """
+    if index is None or df is None:
+        print("Error: Index or DataFrame is None")
+        return [[] for _ in queries]
+    
+    if not queries:
+        return []
+    
+    if model is None:
+        model = load_embedding_model()
+    query_embeddings = encode_queries(queries, model)
+    
+    if max_prices is None:
+        max_prices = [None] * len(queries)
+    
+    # Search queries with and without a budget separately, so each query is
+    # fetched with the same depth and params as in search_faiss_index
+    results = [None] * len(queries)
+    for filtered in (False, True):
+        rows = [i for i, max_price in enumerate(max_prices) if (max_price is not None) == filtered]
+        if not rows:
+            continue
+        fetch_k = top_k * PRICE_FILTER_OVERFETCH if filtered else top_k
+        similarities, indices = index.search(
+            query_embeddings[rows], fetch_k, params=_search_params(index, fetch_k)
+        )
+        for row, row_indices, row_similarities in zip(rows, indices, similarities):
+            results[row] = _build_recommendations(
+                df, row_indices, row_similarities, top_k, max_prices[row], records
+            )
+    
+    return results
+
+
+def _build_recommendations(df, indices, similarities, top_k, max_price=None, records=None):
+    """
+    Turn one row of FAISS search output into at most top_k
+    (course_dict, similarity_score) tuples, dropping courses over max_price.
+    FAISS returns course ids; courses are copied from records when given,
+    otherwise read from df.
+    """
     recommendations = []
-    for i, (idx, similarity) in enumerate(zip(indices[0], similarities)):
-        if idx < len(df):  # Ensure index is valid
-            course = df.iloc[idx].to_dict()
-            recommendations.append((course, float(similarity)))
+    for idx, similarity in zip(indices, similarities):
+        idx = int(idx)
+        if idx not in df.index:  # Ensure index is valid (-1 marks an unfilled slot)
+            continue
+        course = dict(records[idx]) if records is not None else df.loc[idx].to_dict()
+        if max_price is not None and course['Price'] > max_price:
+            continue
+        recommendations.append((course, float(similarity)))
+        if len(recommendations) == top_k:
+            break
     
     return recommendations
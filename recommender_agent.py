@@ -1,17 +1,81 @@
 import os
-from cosine_faiss_utils import create_and_save_faiss_index, load_faiss_index, search_faiss_index
+import re
+from cosine_faiss_utils import (
+    EXAMPLE_QUERIES,
+    create_and_save_faiss_index,
+    example_key,
+    load_embedding_model,
+    load_example_embeddings,
+    load_faiss_index,
+    saved_index_is_stale,
+    search_faiss_index,
+    search_faiss_index_batch,
+    update_faiss_index,
+)
+
+# Budget phrases such as "under 5000", "below ₹10,000" or "less than 5k". Numbers
+# followed by a time unit ("under 40 hours", "within 6 months") are durations.
+BUDGET_PATTERN = re.compile(
+    r'\b(?:under|below|less than|within|up to|upto)\s*(?:₹|rs\.?|inr)?\s*(\d[\d,]*(?:\.\d+)?)(?![\d,]|\.\d)'
+    r'(?!\s*(?:hours?|hrs?|h|minutes?|mins?|days?|weeks?|wks?|months?|years?|yrs?)\b)'
+    r'\s*(k\b)?',
+    re.IGNORECASE
+)
+
+
+def parse_budget(query):
+    """
+    Extract a price limit from a user query.
+    
+    Args:
+        query (str): User query, e.g. "python programming under 10000"
+    
+    Returns:
+        float or None: The maximum price in rupees, or None if the query has no budget
+    """
+    match = BUDGET_PATTERN.search(query)
+    if match is None:
+        return None
+    
+    budget = float(match.group(1).replace(',', ''))
+    if match.group(2):
+        budget *= 1000
+    return budget
+
 
 class CourseRecommender:
     """
     A course recommendation agent that uses FAISS for similarity search.
     """
     
-    def __init__(self):
+    def __init__(self, model=None, index=None, df=None, example_embeddings=None):
         """
         Initialize the CourseRecommender by loading the FAISS index and processed course data.
+        
+        Args:
+            model (SentenceTransformer, optional): Preloaded embedding model. If not
+                given, the model is loaded once here and reused for every query.
+            index (faiss.Index, optional): Preloaded FAISS index
+            df (pd.DataFrame, optional): Preloaded processed course data. It is shared
+                with the caller and must not be modified.
+            example_embeddings (dict, optional): Preloaded output of load_example_embeddings
+        
+        The index and course data are loaded from disk unless both are given.
         """
         print("Initializing Course Recommender...")
-        self.index, self.df = load_faiss_index()
+        self.model = model if model is not None else load_embedding_model()
+        if index is not None and df is not None:
+            self.index, self.df = index, df
+        else:
+            self.index, self.df = load_faiss_index()
+        
+        # Materialize the courses once so building results needs no pandas row access
+        self.records = self.df.to_dict('index') if self.df is not None else None
+        
+        # Embeddings of the example queries, computed when the index was built
+        if example_embeddings is None:
+            example_embeddings = load_example_embeddings()
+        self.example_embeddings = example_embeddings
         
         if self.index is None or self.df is None:
             print("Warning: Failed to load FAISS index or course data.")
@@ -19,13 +83,17 @@ class CourseRecommender:
         else:
             print(f"Course Recommender initialized successfully with {len(self.df)} courses.")
     
-    def get_recommendations(self, query, top_k=10):
+    def get_recommendations(self, query, top_k=10, query_embedding=None):
         """
         Get course recommendations based on a user query.
         
+        A budget in the query (e.g. "under 5000") is applied as a price filter.
+        
         Args:
             query (str): User query describing desired course characteristics
             top_k (int): Number of top recommendations to return (default: 10)
+            query_embedding (np.ndarray, optional): Precomputed embedding of the query,
+                as returned by encode_query
         
         Returns:
             list: List of tuples containing (course_dict, similarity_score)
@@ -35,7 +103,16 @@ class CourseRecommender:
             return []
         
         print(f"Searching for courses similar to: '{query}'")
-        recommendations = search_faiss_index(query, self.index, self.df, top_k)
+        if query_embedding is None:
+            query_embedding = self.example_embedding(query)
+        max_price = parse_budget(query)
+        if max_price is not None:
+            print(f"Only including courses priced at or below ₹{max_price:,.0f}")
+        recommendations = search_faiss_index(
+            query, self.index, self.df, top_k,
+            model=self.model, query_embedding=query_embedding, max_price=max_price,
+            records=self.records
+        )
         
         if recommendations:
             print(f"Found {len(recommendations)} recommendations:")
@@ -47,6 +124,40 @@ class CourseRecommender:
         
         return recommendations
     
+    def example_embedding(self, query):
+        """
+        Look up the precomputed embedding of an example query.
+        
+        Args:
+            query (str): User query
+        
+        Returns:
+            np.ndarray or None: The embedding if query is one of EXAMPLE_QUERIES, else None
+        """
+        return self.example_embeddings.get(example_key(query))
+    
+    def recommend_batch(self, queries, top_k=10):
+        """
+        Get course recommendations for several queries with one encode and one search call.
+        
+        Args:
+            queries (list): User queries describing desired course characteristics
+            top_k (int): Number of top recommendations to return per query (default: 10)
+        
+        Returns:
+            list: One list of (course_dict, similarity_score) tuples per query
+        """
+        if self.index is None or self.df is None:
+            print("Error: Recommender not properly initialized. Cannot provide recommendations.")
+            return [[] for _ in queries]
+        
+        print(f"Searching for courses similar to {len(queries)} queries")
+        max_prices = [parse_budget(query) for query in queries]
+        return search_faiss_index_batch(
+            queries, self.index, self.df, top_k,
+            model=self.model, max_prices=max_prices, records=self.records
+        )
+    
     def display_recommendation_details(self, recommendations):
         """
         Display detailed information about the recommended courses.
@@ -97,6 +208,18 @@ def main():
         else:
             print(f"Error: {csv_path} not found in current directory.")
             return
+    # Rebuild files saved before course ids were stored, whatever their mtime
+    elif saved_index_is_stale():
+        print("Saved index has no course ids, rebuilding it...")
+        if os.path.exists(csv_path):
+            create_and_save_faiss_index(csv_path)
+        else:
+            print(f"Error: {csv_path} not found in current directory.")
+            return
+    # Apply changes to the course data without rebuilding the whole index
+    elif os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime('course_index.faiss'):
+        print("Course data changed, updating FAISS index...")
+        update_faiss_index(csv_path)
     
     # Initialize the recommender
     recommender = CourseRecommender()
@@ -110,16 +233,7 @@ def main():
     print("COURSE RECOMMENDATION SYSTEM DEMO")
     print("="*60)
     
-    # Example queries
-    example_queries = [
-        "artificial intelligence machine learning",
-        "web development fullstack programming",
-        "data science analytics",
-        "communication skills leadership",
-        "python programming"
-    ]
-    
-    for query in example_queries:
+    for query in EXAMPLE_QUERIES:
         print(f"\n{'='*40}")
         print(f"Query: '{query}'")
         print('='*40)
@@ -1,91 +1,233 @@
 #!/usr/bin/env python3
 """
-Test script for the FutureSkills Course Recommender system.
-This script tests the core functionality and provides example usage.
+Tests for the FutureSkills Course Recommender system.
+
+The embedding model and recommender are loaded once per test session and
+shared by all tests. Run from the project directory with:
+    python -m pytest test_system.py
 """
 
 import os
 import sys
-from recommender_agent import CourseRecommender, create_and_save_faiss_index
-
-def test_system():
-    """Test the course recommendation system"""
-    
-    print("="*60)
-    print("FUTURESKILLS COURSE RECOMMENDER - SYSTEM TEST")
-    print("="*60)
-    
-    # Check if CSV file exists
-    csv_path = "FutureSkills Prime_data.csv"
-    if not os.path.exists(csv_path):
-        print(f"❌ Error: {csv_path} not found!")
-        print("Please ensure the CSV file is in the current directory.")
-        return False
-    
-    print(f"✅ Found dataset: {csv_path}")
-    
-    # Create FAISS index if it doesn't exist
-    if not os.path.exists('course_index.faiss') or not os.path.exists('processed_courses.csv'):
-        print("🔄 Creating FAISS index for the first time...")
-        try:
-            create_and_save_faiss_index(csv_path)
-            print("✅ FAISS index created successfully!")
-        except Exception as e:
-            print(f"❌ Error creating FAISS index: {e}")
-            return False
-    else:
-        print("✅ FAISS index already exists")
-    
-    # Initialize recommender
-    print("🔄 Initializing recommender...")
-    try:
-        recommender = CourseRecommender()
-        if not recommender.is_ready():
-            print("❌ Failed to initialize recommender")
-            return False
-        print("✅ Recommender initialized successfully!")
-    except Exception as e:
-        print(f"❌ Error initializing recommender: {e}")
-        return False
-    
-    # Test queries
-    test_queries = [
-        "artificial intelligence",
-        "web development",
-        "data science",
-        "python programming",
-        "business communication"
-    ]
-    
-    print("\n" + "="*60)
-    print("TESTING RECOMMENDATION FUNCTIONALITY")
-    print("="*60)
-    
-    for i, query in enumerate(test_queries, 1):
-        print(f"\n🔍 Test {i}: '{query}'")
-        try:
-            recommendations = recommender.get_recommendations(query, top_k=3)
-            if recommendations:
-                print(f"✅ Found {len(recommendations)} recommendations")
-                for j, (course, score) in enumerate(recommendations, 1):
-                    print(f"   {j}. {course['Title']} (Score: {score:.4f})")
-            else:
-                print("⚠️  No recommendations found")
-        except Exception as e:
-            print(f"❌ Error during search: {e}")
-            return False
-    
-    print("\n" + "="*60)
-    print("🎉 ALL TESTS PASSED! System is working correctly.")
-    print("="*60)
-    print("\nTo run the web interface:")
-    print("  streamlit run app.py")
-    print("\nTo run individual tests:")
-    print("  python recommender_agent.py")
-    
-    return True
+import faiss
+import numpy as np
+import pandas as pd
+import pytest
+import cosine_faiss_utils
+from cosine_faiss_utils import (
+    EXAMPLE_QUERIES,
+    _add_to_index,
+    _flat_copy,
+    _new_index,
+    _search_params,
+    add_courses,
+    encode_query,
+    load_courses_df,
+    load_embedding_model,
+    load_index,
+    remove_courses,
+    saved_index_is_stale,
+    search_faiss_index,
+    update_faiss_index,
+)
+from recommender_agent import CourseRecommender, create_and_save_faiss_index, parse_budget
+
+CSV_PATH = "FutureSkills Prime_data.csv"
+
+TEST_QUERIES = [
+    "artificial intelligence",
+    "web development",
+    "data science",
+    "python programming",
+    "business communication"
+]
+
+
+@pytest.fixture(scope="session")
+def model():
+    """Load the sentence transformer model once for the whole test session"""
+    return load_embedding_model()
+
+
+@pytest.fixture(scope="session")
+def recommender(model):
+    """Build the FAISS index if needed and initialize a shared recommender"""
+    if (not os.path.exists('course_index.faiss') or not os.path.exists('processed_courses.csv')
+            or saved_index_is_stale()):
+        create_and_save_faiss_index(CSV_PATH, model=model)
+
+    recommender = CourseRecommender(model=model)
+    assert recommender.is_ready(), "Failed to initialize recommender"
+    return recommender
+
+
+def test_dataset_exists():
+    """The original course dataset must be in the current directory"""
+    assert os.path.exists(CSV_PATH), f"{CSV_PATH} not found"
+
+
+@pytest.mark.parametrize("query", TEST_QUERIES)
+def test_get_recommendations(recommender, query):
+    """Each query returns up to top_k courses, best match first"""
+    recommendations = recommender.get_recommendations(query, top_k=3)
+
+    assert 0 < len(recommendations) <= 3
+    scores = [score for _, score in recommendations]
+    assert scores == sorted(scores, reverse=True)
+    for course, _ in recommendations:
+        assert course['Title']
+
+
+def test_search_params_reach_hnsw_index(recommender):
+    """efSearch is scaled with top_k even though the HNSW graph is wrapped in an id map"""
+    params = _search_params(recommender.index, 10)
+
+    assert params is not None
+    assert params.efSearch == 40
+    assert _search_params(recommender.index, 3).efSearch == 32
+
+
+@pytest.mark.parametrize("factory", ["Flat", "IVF4,Flat"])
+def test_other_index_factories(factory, monkeypatch):
+    """Index layouts without an HNSW graph can be built and searched too"""
+    monkeypatch.setattr(cosine_faiss_utils, 'INDEX_FACTORY', factory)
+    vectors = np.random.default_rng(0).random((64, 8), dtype=np.float32)
+    faiss.normalize_L2(vectors)
+
+    index = _new_index(8)
+    _add_to_index(index, vectors, np.arange(100, 164))
+    _, ids = index.search(vectors[:1], 1, params=_search_params(index, 1))
+    assert ids[0][0] == 100
+
+
+def test_flat_copy_for_gpu_keeps_course_ids(recommender, model):
+    """The exact flat copy searched on GPU finds courses under the same ids"""
+    flat = _flat_copy(recommender.index, faiss.IndexFlatIP(recommender.index.d))
+    assert flat.ntotal == recommender.index.ntotal
+
+    for course_id in recommender.df.index[:5]:
+        course_text = recommender.df.loc[course_id, 'combined_features']
+        results = search_faiss_index(course_text, flat, recommender.df, top_k=1, model=model)
+        assert results[0][0]['combined_features'] == course_text
+        assert results[0][1] == pytest.approx(1.0, abs=1e-3)
+
+
+def test_budget_filter(recommender):
+    """A budget in the query excludes courses priced above it"""
+    recommendations = recommender.get_recommendations("data science under 1000", top_k=5)
+
+    assert recommendations
+    assert all(course['Price'] <= 1000 for course, _ in recommendations)
+
+
+def test_recommend_batch_matches_single_queries(recommender):
+    """Batched search returns the same results as searching one query at a time"""
+    batch = recommender.recommend_batch(TEST_QUERIES, top_k=3)
+
+    assert len(batch) == len(TEST_QUERIES)
+    for query, batch_recommendations in zip(TEST_QUERIES, batch):
+        single = recommender.get_recommendations(query, top_k=3)
+        assert [course['Title'] for course, _ in batch_recommendations] == \
+            [course['Title'] for course, _ in single]
+
+
+def test_recommend_batch_with_mixed_budgets(recommender):
+    """A budget on one query does not change the results of the others in the batch"""
+    queries = ["data science under 1000"] + TEST_QUERIES
+    batch = recommender.recommend_batch(queries, top_k=3)
+
+    assert len(batch) == len(queries)
+    for query, batch_recommendations in zip(queries, batch):
+        single = recommender.get_recommendations(query, top_k=3)
+        assert [course['Title'] for course, _ in batch_recommendations] == \
+            [course['Title'] for course, _ in single]
+        assert [score for _, score in batch_recommendations] == \
+            pytest.approx([score for _, score in single], abs=1e-5)
+
+
+def test_remove_and_add_course(recommender, model):
+    """Courses can be removed from and added back to the index without a rebuild"""
+    index = load_index(mmap=False, to_gpu=False)
+    df = recommender.df
+    course_id = df.index[0]
+    course_text = df.loc[course_id, 'combined_features']
+
+    index, remaining = remove_courses(index, df, [course_id])
+    assert index.ntotal == len(df) - 1
+    results = search_faiss_index(course_text, index, remaining, top_k=5, model=model)
+    assert all(course['content_hash'] != df.loc[course_id, 'content_hash'] for course, _ in results)
+
+    updated = add_courses(index, remaining, df.loc[[course_id]], model=model)
+    assert index.ntotal == len(df)
+    results = search_faiss_index(course_text, index, updated, top_k=1, model=model)
+    assert results[0][0]['Title'] == df.loc[course_id, 'Title']
+
+
+def test_update_tracks_duplicate_courses(model, tmp_path, monkeypatch):
+    """Incremental updates index the same courses as a full rebuild, duplicates included"""
+    source = pd.read_csv(CSV_PATH)
+    monkeypatch.chdir(tmp_path)
+    source.to_csv(CSV_PATH, index=False)
+    create_and_save_faiss_index(CSV_PATH, model=model)
+
+    # Add a duplicate of an existing course
+    pd.concat([source, source.iloc[[0]]]).to_csv(CSV_PATH, index=False)
+    update_faiss_index(CSV_PATH, model=model)
+    assert load_index(mmap=False, to_gpu=False).ntotal == len(source) + 1
+    assert len(load_courses_df()) == len(source) + 1
+
+    # Remove it again
+    source.to_csv(CSV_PATH, index=False)
+    update_faiss_index(CSV_PATH, model=model)
+    assert load_index(mmap=False, to_gpu=False).ntotal == len(source)
+    assert len(load_courses_df()) == len(source)
+
+
+def test_stale_index_is_rebuilt(model, tmp_path, monkeypatch):
+    """Files saved before course ids were stored are rebuilt rather than updated"""
+    source = pd.read_csv(CSV_PATH)
+    monkeypatch.chdir(tmp_path)
+    source.to_csv(CSV_PATH, index=False)
+
+    # The old layout: a bare L2 index and processed data without ids or hashes
+    faiss.write_index(faiss.IndexFlatL2(8), 'course_index.faiss')
+    source.to_csv('processed_courses.csv', index=False)
+    assert saved_index_is_stale()
+
+    update_faiss_index(CSV_PATH, model=model)
+    assert not saved_index_is_stale()
+    assert isinstance(load_index(mmap=False, to_gpu=False), faiss.IndexIDMap2)
+    assert len(load_courses_df()) == len(source)
+
+
+def test_example_queries_use_precomputed_embeddings(recommender, model):
+    """Example queries are served from embeddings saved with the index"""
+    for query in EXAMPLE_QUERIES:
+        cached = recommender.example_embedding(f"  {query.upper()} ")
+        assert cached is not None
+        np.testing.assert_allclose(cached, encode_query(query, model), atol=1e-5)
+
+    assert recommender.example_embedding("something else entirely") is None
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("python programming under 10000", 10000),
+    ("courses below ₹10,000", 10000),
+    ("business courses less than 5k", 5000),
+    ("business courses cheap", None),
+    ("ai courses under 40 hours", None),
+    ("data science courses under 6 months", None),
+    ("python within 2 weeks", None),
+    ("leadership courses under 90 mins", None),
+    ("short courses under 3 days under 2000", 2000),
+    ("python under 1.5 hours", None),
+    ("ai course under 2.5k", 2500),
+    ("I want a python course under 5000.", 5000),
+])
+def test_parse_budget(query, expected):
+    """Budgets are read from common phrasings and absent otherwise"""
+    assert parse_budget(query) == expected
+
 
 if __name__ == "__main__":
-    success = test_system()
-    if not success:
-        sys.exit(1)
+    sys.exit(pytest.main([__file__]))